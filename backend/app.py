@@ -1,19 +1,33 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
-from pymongo import MongoClient
+from fastapi.concurrency import run_in_threadpool
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
 from bson import ObjectId
+from bson.errors import InvalidId
+from bson.int64 import Int64
 from deep_translator import GoogleTranslator
-from groq import Groq
+from groq import AsyncGroq
 from dotenv import load_dotenv
+from cachetools import TTLCache
+from blake3 import blake3
+from bisect import bisect_right
+from functools import lru_cache
+import numpy as np
+import asyncio
+import bcrypt
 import hashlib
+import hmac
 import json
-import re
 import os
 import random
+import threading
+import time
 from typing import Optional, List
 
 # Load environment variables
@@ -34,7 +48,10 @@ if not GROQ_API_KEY:
 
 DATABASE_NAME = os.getenv("DATABASE_NAME", "riddleapp")
 
-groq_client = Groq(api_key=GROQ_API_KEY)
+# Optional: unpacked Argos en->hi package for offline translation
+HINDI_MODEL_DIR = os.getenv("HINDI_MODEL_DIR")
+
+groq_client = AsyncGroq(api_key=GROQ_API_KEY)
 
 # ==================== ACHIEVEMENT RANKS ====================
 ACHIEVEMENT_RANKS = [
@@ -45,81 +62,141 @@ ACHIEVEMENT_RANKS = [
     {"points": 2000, "rank": "👑 Platinum Legend", "title": "Platinum Wizard", "icon": "👑"},
 ]
 
+# Rank thresholds in ascending order, for bisect lookups
+_RANK_POINTS = tuple(r["points"] for r in ACHIEVEMENT_RANKS)
+_RANK_INFO = tuple(ACHIEVEMENT_RANKS)
+# Same thresholds as an array, so vectorised lookups don't rebuild it per call
+_RANK_THRESHOLDS = np.array(_RANK_POINTS, dtype=np.int64)
+
+# Everything /achievements reports except points_to_next, indexed by how many
+# ranks are unlocked (0 when points have gone negative)
+_ACHIEVEMENTS_BY_UNLOCKED = tuple(
+    {
+        "current_rank": ACHIEVEMENT_RANKS[max(n - 1, 0)],
+        "next_rank": ACHIEVEMENT_RANKS[n] if n < len(ACHIEVEMENT_RANKS) else None,
+        "unlocked_achievements": ACHIEVEMENT_RANKS[:n],
+        "total_achievements": len(ACHIEVEMENT_RANKS),
+        "progress_percent": round((n / len(ACHIEVEMENT_RANKS)) * 100, 1)
+    }
+    for n in range(len(ACHIEVEMENT_RANKS) + 1)
+)
+
+@lru_cache(maxsize=1024)
 def get_user_rank(points):
     """Get user's rank based on points"""
-    rank_info = ACHIEVEMENT_RANKS[0]
-    
-    for achievement in ACHIEVEMENT_RANKS:
-        if points >= achievement["points"]:
-            rank_info = achievement
-        else:
-            break
-    
-    return rank_info
+    return _RANK_INFO[max(bisect_right(_RANK_POINTS, points) - 1, 0)]
 
 # ==================== DATABASE WITH CONNECTION POOLING ====================
-try:
-    client = MongoClient(
-        MONGO_URL,
-        maxPoolSize=50,
-        minPoolSize=10,
-        maxIdleTimeMS=30000,
-        serverSelectionTimeoutMS=5000,
-        retryWrites=True
-    )
-    # Test connection
-    client.admin.command('ping')
-    db = client[DATABASE_NAME]
-    print("✅ MongoDB Atlas connected successfully")
-except Exception as e:
-    print(f"❌ MongoDB connection failed: {e}")
-    exit(1)
+# Async driver so handlers overlap Mongo round-trips on the event loop
+# instead of each holding a threadpool worker. Connection is verified on startup.
+client = AsyncIOMotorClient(
+    MONGO_URL,
+    maxPoolSize=100,
+    minPoolSize=20,
+    maxIdleTimeMS=30000,
+    serverSelectionTimeoutMS=5000,
+    retryWrites=True
+)
+db = client[DATABASE_NAME]
 
 # ==================== AUTH SETUP ====================
 security = HTTPBearer(auto_error=False)
 
 def hash_password(password: str) -> str:
-    return hashlib.sha256(password.encode()).hexdigest()
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=12)).decode()
+
+def is_legacy_hash(hashed: str) -> bool:
+    """Accounts created before bcrypt still store an unsalted SHA256 hex digest"""
+    return not hashed.startswith("$2")
 
 def verify_password(plain: str, hashed: str) -> bool:
-    return hashlib.sha256(plain.encode()).hexdigest() == hashed
+    if is_legacy_hash(hashed):
+        return hmac.compare_digest(hashlib.sha256(plain.encode()).hexdigest(), hashed)
+    return bcrypt.checkpw(plain.encode(), hashed.encode())
+
+def create_token(user_id: ObjectId, token_version: int = 0) -> str:
+    now = datetime.utcnow()
+    expire = now + timedelta(days=30)
+    return jwt.encode(
+        {"sub": str(user_id), "ver": token_version, "iat": now, "exp": expire},
+        SECRET_KEY,
+        algorithm="HS256"
+    )
+
+def parse_object_id(value: str, detail: str) -> ObjectId:
+    """Convert an id received from a client, 404 if it can't be one of ours"""
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        raise HTTPException(status_code=404, detail=detail)
+
+# Short-lived caches so authenticated requests skip the JWT verify and user lookup
+_token_cache = TTLCache(maxsize=10000, ttl=30)
+_user_cache = TTLCache(maxsize=5000, ttl=60)
 
-def create_token(user_id: str) -> str:
-    expire = datetime.utcnow() + timedelta(days=30)
-    return jwt.encode({"sub": user_id, "exp": expire}, SECRET_KEY, algorithm="HS256")
+def invalidate_user_cache(user_id: ObjectId):
+    """Drop a cached user document after it has been modified"""
+    _user_cache.pop(str(user_id), None)
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     if not credentials:
         raise HTTPException(status_code=401, detail="Authorization header missing")
     
-    try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=["HS256"])
-        user_id = payload.get("sub")
-        
-        if not user_id:
-            raise HTTPException(status_code=401, detail="Invalid token payload")
+    token_key = hashlib.sha256(credentials.credentials.encode()).digest()
+    payload = _token_cache.get(token_key)
+    
+    # Never serve a cached payload past the token's own expiry
+    if payload is None or payload.get("exp", 0) <= time.time():
+        try:
+            payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=["HS256"])
+        except JWTError as e:
+            print(f"❌ JWT Error: {e}")
+            raise HTTPException(status_code=401, detail="Invalid or expired token")
         
-        user = db.users.find_one({"_id": user_id})
+        _token_cache[token_key] = payload
+    
+    user_id = payload.get("sub")
+    
+    if not user_id or not ObjectId.is_valid(user_id):
+        raise HTTPException(status_code=401, detail="Invalid token payload")
+    
+    user = _user_cache.get(user_id)
+    
+    if user is None:
+        # History arrays grow over time, so they are loaded only where needed.
+        # Daily challenges are appended in date order, so the last one is
+        # enough to tell whether today's was completed.
+        user = await db.users.find_one(
+            {"_id": ObjectId(user_id)},
+            {
+                "seen_riddles": 0,
+                "seen_bloom": 0,
+                "password": 0,
+                "daily_challenges_completed": {"$slice": -1}
+            }
+        )
         
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
         
-        return user
-        
-    except JWTError as e:
-        print(f"❌ JWT Error: {e}")
+        _user_cache[user_id] = user
+    
+    # Logging out bumps token_version, which retires every token issued before it
+    if payload.get("ver", 0) != user.get("token_version", 0):
         raise HTTPException(status_code=401, detail="Invalid or expired token")
+    
+    return user
 
 # ==================== AI RIDDLE GENERATION WITH DIVERSITY ====================
 
 RIDDLE_CATEGORIES = ["logic", "wordplay", "math", "nature", "objects", "general"]
 
 # Common riddle answers to AVOID (prevent repetition)
-COMMON_ANSWERS = [
+COMMON_ANSWERS = frozenset({
     "clock", "shadow", "mirror", "time", "echo", "silence", "breath", "darkness",
     "light", "fire", "candle", "river", "cloud", "egg", "towel", "keyboard",
     "stamp", "bottle", "pencil", "coin"
-]
+})
 
 # Diverse prompts for better variety
 RIDDLE_PROMPTS = [
@@ -133,170 +210,356 @@ RIDDLE_PROMPTS = [
     "Make a math-based riddle with a clever logical answer."
 ]
 
+# Fixed instructions sent first on every request so Groq can reuse the cached prefix;
+# anything that changes per call goes in the user message after it
+RIDDLE_RULES = """Generate ONE unique riddle in JSON format:
+{"question": "creative riddle", "answer": "one word", "difficulty": "easy"}
+
+IMPORTANT RULES:
+- Answer must be ONE WORD only (lowercase)
+- Answer MUST NOT be any of the words listed in the request
+- Question must be creative and UNIQUE
+- Use uncommon words as answers
+- Think of unusual objects, concepts, or things
+- Avoid cliché riddles
+
+Examples of GOOD answers: umbrella, bridge, library, compass, recipe, alphabet, photograph
+Examples of BAD answers: clock, shadow, time, mirror, echo
+
+Only output JSON, nothing else."""
+
 def create_riddle_hash(question: str, answer: str) -> str:
     """Create a unique hash for a riddle to detect duplicates"""
     combined = f"{question.lower().strip()}{answer.lower().strip()}"
-    return hashlib.md5(combined.encode()).hexdigest()
-
-def check_riddle_exists(answer: str, question: str = None) -> bool:
-    """Check if riddle with same answer or question already exists"""
-    # Check by answer
-    existing = db.riddles.find_one({
-        "answer": answer.lower().strip(),
-        "language": "en"
-    })
+    return blake3(combined.encode()).hexdigest(length=8)
+
+# ==================== RIDDLE STATS ====================
+# Counters kept in one small document so status endpoints don't recount riddles
+
+# Indexes that counts are pinned to so they stay index-only
+LANGUAGE_INDEX = [("language", 1), ("answer", 1)]
+ROOM_STATUS_INDEX = [("status", 1), ("_id", 1)]
+
+async def count_with_hint(collection, query: dict, hint: list) -> int:
+    """count_documents on the hinted index, or on the planner's choice if that index is missing"""
     
-    if existing:
-        return True
+    try:
+        return await collection.count_documents(query, hint=hint)
+    except OperationFailure as e:
+        print(f"⚠️ Index {hint} unavailable, counting without hint: {e}")
+        return await collection.count_documents(query)
+
+async def count_distinct_answers(language: str) -> int:
+    """Number of distinct answers, counted server-side"""
     
-    # Check by question hash if provided
-    if question:
-        riddle_hash = create_riddle_hash(question, answer)
-        existing = db.riddles.find_one({
-            "riddle_hash": riddle_hash
-        })
-        if existing:
-            return True
+    result = await db.riddles.aggregate([
+        {"$match": {"language": language}},
+        {"$group": {"_id": "$answer"}},
+        {"$count": "n"}
+    ], allowDiskUse=False).to_list(1)
     
-    return False
+    return result[0]["n"] if result else 0
 
-def generate_fresh_ai_riddle(category: str = "general", max_retries: int = 5):
-    """Generate unique riddle using Groq with better diversity"""
+async def refresh_riddle_stats() -> dict:
+    """Recount everything and store it in the stats document"""
     
-    for attempt in range(max_retries):
-        try:
-            # Use random prompt for variety
-            random_prompt = random.choice(RIDDLE_PROMPTS)
-            category_prompt = f" Category: {category}." if category != "general" else ""
-            
-            # Get list of existing answers to avoid
-            existing_answers = list(db.riddles.find(
-                {"language": "en"},
-                {"answer": 1}
-            ).limit(100))
-            
-            existing_answers_list = [r["answer"] for r in existing_answers if "answer" in r]
-            all_avoid = list(set(COMMON_ANSWERS + existing_answers_list))
-            avoid_text = ", ".join(all_avoid[:20]) if all_avoid else "clock, shadow, mirror"
-            
-            response = groq_client.chat.completions.create(
-                model="llama-3.1-8b-instant",
-                messages=[{
-                    "role": "user",
-                    "content": f"""{random_prompt}
+    en_unique, en_total, hi_total = await asyncio.gather(
+        count_distinct_answers("en"),
+        count_with_hint(db.riddles, {"language": "en"}, LANGUAGE_INDEX),
+        count_with_hint(db.riddles, {"language": "hi"}, LANGUAGE_INDEX)
+    )
+    stats = {"en_unique": en_unique, "en_total": en_total, "hi_total": hi_total}
+    await db.stats.update_one({"_id": "riddle_stats"}, {"$set": stats}, upsert=True)
+    
+    return stats
 
-Generate ONE unique riddle in JSON format:
-{{"question": "creative riddle", "answer": "one word", "difficulty": "easy"}}
+async def record_riddle_insert(language: str):
+    """Bump the counters after a riddle is stored"""
+    
+    # The unique (answer, language) index means every new English riddle is a new answer
+    inc = {"en_total": 1, "en_unique": 1} if language == "en" else {f"{language}_total": 1}
+    await db.stats.update_one({"_id": "riddle_stats"}, {"$inc": inc}, upsert=True)
+    _status_cache.clear()
 
-{category_prompt}
+async def get_riddle_stats() -> dict:
+    return await db.stats.find_one({"_id": "riddle_stats"}) or {}
 
-IMPORTANT RULES:
-- Answer must be ONE WORD only (lowercase)
-- Answer MUST NOT be any of these: {avoid_text}
-- Question must be creative and UNIQUE
-- Use uncommon words as answers
-- Think of unusual objects, concepts, or things
-- Avoid cliché riddles
+# Answers already used by English riddles, plus the prompt text listing
+# some of them; refreshed at most once a minute
+_avoid_cache = TTLCache(maxsize=1, ttl=60)
 
-Examples of GOOD answers: umbrella, bridge, library, compass, recipe, alphabet, photograph
-Examples of BAD answers: clock, shadow, time, mirror, echo
+async def _load_avoid() -> tuple:
+    avoid = set(await db.riddles.distinct("answer", {"language": "en"}))
+    all_avoid = list(COMMON_ANSWERS | avoid)
+    avoid_text = ", ".join(all_avoid[:20]) if all_avoid else "clock, shadow, mirror"
+    _avoid_cache["en"] = (avoid, avoid_text)
+    return avoid, avoid_text
 
-Only output JSON, nothing else."""
-                }],
-                temperature=1.8,
-                max_tokens=250,
-                top_p=0.95
-            )
-            
-            text = response.choices[0].message.content.strip()
-            text = text.replace('``````', '').strip()
-            
-            json_match = re.search(r'\{[^{}]*"question"[^{}]*"answer"[^{}]*\}', text, re.DOTALL)
+# Groq completions fired concurrently per round of attempts
+RIDDLE_PARALLEL_REQUESTS = 3
+
+_json_decoder = json.JSONDecoder()
+
+async def request_ai_riddle(random_prompt: str, category_prompt: str, avoid_text: str, seed: int):
+    """Ask Groq for one riddle and return the parsed JSON, or None"""
+    
+    stream = await groq_client.chat.completions.create(
+        model="llama-3.1-8b-instant",
+        messages=[
+            {"role": "system", "content": RIDDLE_RULES},
+            {
+                "role": "user",
+                "content": f"""{random_prompt}
+Answer MUST NOT be any of these: {avoid_text}
+{category_prompt}"""
+            }
+        ],
+        temperature=1.8,
+        max_tokens=250,
+        top_p=0.95,
+        seed=seed,
+        stream=True
+    )
+    
+    # Stop reading as soon as a complete riddle object has arrived
+    parts = []
+    try:
+        async for chunk in stream:
+            content = chunk.choices[0].delta.content or ""
+            parts.append(content)
             
-            if json_match:
-                riddle_data = json.loads(json_match.group())
-                
-                answer = riddle_data["answer"].lower().strip()
-                question = riddle_data["question"].strip()
-                
-                # Validate answer is one word
-                if len(answer.split()) > 1:
-                    print(f"⚠️ Attempt {attempt + 1}: Answer is multiple words: {answer}")
-                    continue
-                
-                # Check if answer is in avoid list
-                if answer in COMMON_ANSWERS:
-                    print(f"⚠️ Attempt {attempt + 1}: Common answer detected: {answer}")
-                    continue
-                
-                # Check if riddle already exists
-                if check_riddle_exists(answer, question):
-                    print(f"⚠️ Attempt {attempt + 1}: Duplicate riddle detected: {answer}")
-                    continue
-                
-                # SUCCESS - Create new unique riddle
-                new_id = str(ObjectId())
-                riddle_hash = create_riddle_hash(question, answer)
-                
-                riddle = {
-                    "_id": new_id,
-                    "question": question,
-                    "answer": answer,
-                    "riddle_hash": riddle_hash,
-                    "category": category,
-                    "difficulty": riddle_data.get("difficulty", "medium"),
-                    "language": "en",
-                    "hints": [],
-                    "source": "groq",
-                    "created_at": datetime.utcnow(),
-                    "shares": 0,
-                    "likes": 0
-                }
-                
-                db.riddles.insert_one(riddle)
-                print(f"✨ Generated UNIQUE riddle #{attempt + 1}: {answer} - {question[:50]}...")
-                return riddle
+            if "}" in content:
+                riddle_data = parse_riddle_json("".join(parts))
+                if riddle_data:
+                    return riddle_data
+    finally:
+        await stream.response.aclose()
+    
+    return parse_riddle_json("".join(parts))
+
+def parse_riddle_json(text: str):
+    """Decode the first JSON object in a completion, or None if there isn't one"""
+    
+    start = text.find('{')
+    if start < 0:
+        return None
+    
+    try:
+        riddle_data, _ = _json_decoder.raw_decode(text, start)
+    except json.JSONDecodeError:
+        return None
+    
+    if isinstance(riddle_data, dict) and "question" in riddle_data and "answer" in riddle_data:
+        return riddle_data
+    
+    return None
+
+async def store_ai_riddle(riddle_data: dict, category: str, existing_answers: set, attempt: int):
+    """Validate a generated riddle and insert it, returning None if rejected"""
+    
+    answer = riddle_data["answer"].lower().strip()
+    question = riddle_data["question"].strip()
+    
+    # Validate answer is one word
+    if len(answer.split()) > 1:
+        print(f"⚠️ Attempt {attempt}: Answer is multiple words: {answer}")
+        return None
+    
+    # Check if answer is in avoid list
+    if answer in COMMON_ANSWERS:
+        print(f"⚠️ Attempt {attempt}: Common answer detected: {answer}")
+        return None
+    
+    # Check against answers we already know about
+    if answer in existing_answers:
+        print(f"⚠️ Attempt {attempt}: Duplicate riddle detected: {answer}")
+        return None
+    
+    # SUCCESS - Create new unique riddle
+    new_id = ObjectId()
+    riddle_hash = create_riddle_hash(question, answer)
+    
+    riddle = {
+        "_id": new_id,
+        "question": question,
+        "answer": answer,
+        "riddle_hash": riddle_hash,
+        "category": category,
+        "difficulty": riddle_data.get("difficulty", "medium"),
+        "language": "en",
+        "hints": [],
+        "source": "groq",
+        "created_at": datetime.utcnow(),
+        "shares": 0,
+        "likes": 0
+    }
+    
+    # Unique indexes on answer and riddle_hash reject duplicates
+    try:
+        await db.riddles.insert_one(riddle)
+    except DuplicateKeyError:
+        print(f"⚠️ Attempt {attempt}: Duplicate riddle detected: {answer}")
+        return None
+    
+    existing_answers.add(answer)
+    await record_riddle_insert("en")
+    print(f"✨ Generated UNIQUE riddle #{attempt}: {answer} - {question[:50]}...")
+    return riddle
+
+async def generate_fresh_ai_riddle(category: str = "general", max_retries: int = 5):
+    """Generate unique riddle using Groq with better diversity"""
+    
+    category_prompt = f" Category: {category}." if category != "general" else ""
+    
+    # Get list of existing answers to avoid
+    existing_answers, avoid_text = _avoid_cache.get("en") or await _load_avoid()
+    
+    attempt = 0
+    prompt_offset = random.randrange(len(RIDDLE_PROMPTS))
+    
+    while attempt < max_retries:
+        # Fire a round of independent completions and keep the first valid one
+        random_prompt = RIDDLE_PROMPTS[(prompt_offset + attempt) % len(RIDDLE_PROMPTS)]
+        round_size = min(RIDDLE_PARALLEL_REQUESTS, max_retries - attempt)
+        pending = {
+            asyncio.create_task(request_ai_riddle(
+                random_prompt, category_prompt, avoid_text, random.randrange(2**31)
+            ))
+            for _ in range(round_size)
+        }
+        
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
                 
-        except Exception as e:
-            print(f"❌ AI Error attempt {attempt + 1}: {e}")
-            continue
+                for task in done:
+                    attempt += 1
+                    
+                    try:
+                        riddle_data = task.result()
+                        if not riddle_data:
+                            continue
+                        
+                        riddle = await store_ai_riddle(riddle_data, category, existing_answers, attempt)
+                        if riddle:
+                            return riddle
+                    except Exception as e:
+                        print(f"❌ AI Error attempt {attempt}: {e}")
+        finally:
+            # Drop stragglers once a riddle is found
+            for task in pending:
+                task.cancel()
     
     print(f"❌ Failed to generate unique riddle after {max_retries} attempts")
     return None
 
+_translation_cache = TTLCache(maxsize=10000, ttl=86400)
+# cachetools caches aren't thread-safe and translations run in the threadpool
+_translation_cache_lock = threading.Lock()
+
+def load_local_translator():
+    """Load the int8 CTranslate2 model from HINDI_MODEL_DIR, if configured"""
+    
+    if not HINDI_MODEL_DIR:
+        return None
+    
+    try:
+        import ctranslate2
+        import sentencepiece
+        
+        translator = ctranslate2.Translator(
+            os.path.join(HINDI_MODEL_DIR, "model"),
+            device="cpu",
+            compute_type="int8"
+        )
+        tokenizer = sentencepiece.SentencePieceProcessor(
+            model_file=os.path.join(HINDI_MODEL_DIR, "sentencepiece.model")
+        )
+        print("✅ Local Hindi translation model loaded")
+        return translator, tokenizer
+    except Exception as e:
+        print(f"⚠️ Local Hindi model unavailable, using Google Translate: {e}")
+        return None
+
+_local_translator_hi = load_local_translator()
+
+def translate_locally(text: str) -> str:
+    translator, tokenizer = _local_translator_hi
+    tokens = tokenizer.encode(text, out_type=str)
+    result = translator.translate_batch([tokens])
+    return tokenizer.decode(result[0].hypotheses[0])
+
 def translate_to_hindi(text: str) -> str:
+    with _translation_cache_lock:
+        cached = _translation_cache.get(text)
+    if cached is not None:
+        return cached
+    
     try:
-        translator = GoogleTranslator(source='en', target='hi')
-        return translator.translate(text)
+        if _local_translator_hi:
+            translated = translate_locally(text)
+        else:
+            # GoogleTranslator keeps per-call state and is cheap to build,
+            # so each call gets its own and cache misses run in parallel
+            translated = GoogleTranslator(source='en', target='hi').translate(text)
     except:
+        # Don't cache failures so the next call retries
         return text
+    
+    with _translation_cache_lock:
+        _translation_cache[text] = translated
+    return translated
+
+# Today's challenge keyed by date; cleared on rollover so it only ever holds one day
+_daily_cache = {}
+_participant_count_cache = TTLCache(maxsize=8, ttl=30)
 
-def get_daily_challenge_riddle():
+async def get_daily_challenge_riddle():
     """Get or create today's daily challenge"""
     today = datetime.utcnow().date()
     
-    challenge = db.daily_challenges.find_one({
+    if today.isoformat() in _daily_cache:
+        return _daily_cache[today.isoformat()]
+    
+    challenge = await db.daily_challenges.find_one({
         "date": today.isoformat()
     })
     
-    if challenge:
-        return challenge
-    
-    riddle = generate_fresh_ai_riddle("logic")
-    
-    if riddle:
+    if not challenge:
+        riddle = await generate_fresh_ai_riddle("logic")
+        
+        if not riddle:
+            return None
+        
         challenge = {
-            "_id": str(ObjectId()),
+            "_id": ObjectId(),
             "date": today.isoformat(),
             "riddle_id": riddle["_id"],
             "riddle": riddle,
             "participants": [],
             "created_at": datetime.utcnow()
         }
-        db.daily_challenges.insert_one(challenge)
-        return challenge
+        await db.daily_challenges.insert_one(challenge)
     
-    return None
+    _daily_cache.clear()
+    _daily_cache[today.isoformat()] = challenge
+    return challenge
+
+async def get_participant_count(challenge_id: ObjectId) -> int:
+    """Participants so far, without re-reading the cached challenge document"""
+    
+    count = _participant_count_cache.get(challenge_id)
+    if count is not None:
+        return count
+    
+    counts = await db.daily_challenges.aggregate([
+        {"$match": {"_id": challenge_id}},
+        {"$project": {"count": {"$size": {"$ifNull": ["$participants", []]}}}}
+    ]).to_list(1)
+    
+    count = counts[0]["count"] if counts else 0
+    _participant_count_cache[challenge_id] = count
+    return count
 
 # ==================== MODELS ====================
 
@@ -342,19 +605,19 @@ app.add_middleware(
 # ==================== AUTH ROUTES ====================
 
 @app.post("/signup")
-def signup(data: SignupRequest):
+async def signup(data: SignupRequest):
     try:
-        if db.users.find_one({"email": data.email}):
+        if await db.users.find_one({"email": data.email}):
             print(f"⚠️ Signup failed: Email {data.email} already exists")
             raise HTTPException(status_code=400, detail="Email already exists")
         
-        user_id = str(ObjectId())
+        user_id = ObjectId()
         
         user_data = {
             "_id": user_id,
             "username": data.username,
             "email": data.email,
-            "password": hash_password(data.password),
+            "password": await run_in_threadpool(hash_password, data.password),
             "language": data.language,
             "solved": 0,
             "correct": 0,
@@ -363,11 +626,14 @@ def signup(data: SignupRequest):
             "seen_riddles": [],
             "current_riddle_attempts": {},
             "daily_challenges_completed": [],
+            "daily_challenges_completed_count": 0,
+            "seen_riddles_count": 0,
             "last_active": None,
             "created_at": datetime.utcnow()
         }
         
-        db.users.insert_one(user_data)
+        await db.users.insert_one(user_data)
+        _status_cache.pop("test", None)
         
         token = create_token(user_id)
         
@@ -375,7 +641,7 @@ def signup(data: SignupRequest):
         
         return {
             "token": token,
-            "user_id": user_id,
+            "user_id": str(user_id),
             "username": data.username,
             "message": "Account created successfully!"
         }
@@ -387,25 +653,33 @@ def signup(data: SignupRequest):
         raise HTTPException(status_code=500, detail="Signup failed")
 
 @app.post("/login")
-def login(data: LoginRequest):
+async def login(data: LoginRequest):
     try:
-        user = db.users.find_one({"email": data.email})
+        user = await db.users.find_one({"email": data.email})
         
         if not user:
             print(f"❌ Login failed: User {data.email} not found")
             raise HTTPException(status_code=401, detail="Invalid email or password")
         
-        if not verify_password(data.password, user["password"]):
+        if not await run_in_threadpool(verify_password, data.password, user["password"]):
             print(f"❌ Login failed: Wrong password for {data.email}")
             raise HTTPException(status_code=401, detail="Invalid email or password")
         
-        token = create_token(user["_id"])
+        # Upgrade legacy SHA256 hashes now that we have the plain password
+        if is_legacy_hash(user["password"]):
+            await db.users.update_one(
+                {"_id": user["_id"]},
+                {"$set": {"password": await run_in_threadpool(hash_password, data.password)}}
+            )
+            invalidate_user_cache(user["_id"])
+        
+        token = create_token(user["_id"], user.get("token_version", 0))
         
         print(f"✅ Login successful: {user['username']} ({data.email})")
         
         return {
             "token": token,
-            "user_id": user["_id"],
+            "user_id": str(user["_id"]),
             "username": user["username"],
             "message": "Login successful!"
         }
@@ -416,10 +690,81 @@ def login(data: LoginRequest):
         print(f"❌ Login error: {e}")
         raise HTTPException(status_code=500, detail="Login failed")
 
+@app.post("/logout")
+async def logout(user: dict = Depends(get_current_user)):
+    """Invalidate every token issued to the user so far"""
+    
+    await db.users.update_one(
+        {"_id": user["_id"]},
+        {"$inc": {"token_version": 1}}
+    )
+    invalidate_user_cache(user["_id"])
+    
+    return {"message": "Logged out successfully!"}
+
 # ==================== RIDDLE ROUTES (FIXED - NO REPEATS) ====================
 
+# Only the most recent riddles are remembered per user; the total shown on
+# /profile comes from seen_riddles_count, which the cap doesn't touch
+SEEN_RIDDLES_LIMIT = 500
+
+# Older history lives in seen_bloom, a Bloom filter stored as a sub-document of
+# int64 words ({"17": <bits>}) so Mongo can set bits atomically with $bit.
+# 16384 bits and 5 hashes give ~3% false positives at ~2000 riddles; past
+# half full the filter is restarted.
+SEEN_BLOOM_WORDS = 256
+SEEN_BLOOM_HASHES = 5
+SEEN_BLOOM_MAX_FILL = 0.5
+RIDDLE_SAMPLE_SIZE = 5
+
+def seen_bloom_masks(riddle_id: ObjectId) -> dict:
+    """Word index -> bit mask of the filter positions for a riddle"""
+    
+    digest = blake3(riddle_id.binary).digest(length=16)
+    h1 = int.from_bytes(digest[:8], "little")
+    h2 = int.from_bytes(digest[8:], "little") | 1
+    
+    masks = {}
+    for i in range(SEEN_BLOOM_HASHES):
+        word, bit = divmod((h1 + i * h2) % (SEEN_BLOOM_WORDS * 64), 64)
+        masks[word] = masks.get(word, 0) | (1 << bit)
+    
+    return masks
+
+def as_int64(mask: int) -> Int64:
+    # BSON longs are signed, so bit 63 has to be stored as a negative number
+    return Int64(mask - (1 << 64) if mask >= 1 << 63 else mask)
+
+def in_seen_bloom(seen_bloom: dict, riddle_id: ObjectId) -> bool:
+    return all(
+        seen_bloom.get(str(word), 0) & mask == mask
+        for word, mask in seen_bloom_masks(riddle_id).items()
+    )
+
+def seen_bloom_full(seen_bloom: dict) -> bool:
+    bits = sum(bin(word & 0xFFFFFFFFFFFFFFFF).count("1") for word in seen_bloom.values())
+    return bits > SEEN_BLOOM_WORDS * 64 * SEEN_BLOOM_MAX_FILL
+
+async def sample_riddle(query: dict, seen_bloom: Optional[dict] = None):
+    """Let Mongo pick one random riddle matching the query.
+    
+    With a seen_bloom, a few candidates are sampled and the first one the
+    user hasn't been served before is returned (None if all were).
+    """
+    
+    size = RIDDLE_SAMPLE_SIZE if seen_bloom else 1
+    riddles = await db.riddles.aggregate([
+        {"$match": query},
+        {"$sample": {"size": size}}
+    ]).to_list(size)
+    
+    if not seen_bloom:
+        return riddles[0] if riddles else None
+    
+    return next((r for r in riddles if not in_seen_bloom(seen_bloom, r["_id"])), None)
+
 @app.get("/riddle")
-def get_random_riddle(
+async def get_random_riddle(
     language: str = "en", 
     category: Optional[str] = None,
     user: dict = Depends(get_current_user)
@@ -428,9 +773,20 @@ def get_random_riddle(
     
     user_id = user["_id"]
     
-    # Get seen riddles and ensure they're all strings
-    seen_riddles_raw = user.get("seen_riddles", [])
-    seen_riddles = list(set([str(rid) for rid in seen_riddles_raw if rid]))
+    # Recently seen riddle ObjectIds (already capped and deduplicated when pushed)
+    seen_docs = await db.users.aggregate([
+        {"$match": {"_id": user_id}},
+        {"$project": {
+            "seen_riddles": {"$slice": [{"$ifNull": ["$seen_riddles", []]}, -SEEN_RIDDLES_LIMIT]},
+            "seen_bloom": 1
+        }}
+    ]).to_list(1)
+    seen_riddles = seen_docs[0]["seen_riddles"] if seen_docs else []
+    seen_bloom = (seen_docs[0].get("seen_bloom") if seen_docs else None) or {}
+    
+    # A saturated filter flags almost everything, so start a fresh one
+    if seen_bloom_full(seen_bloom):
+        seen_bloom = None
     
     print(f"\n{'='*60}")
     print(f"👤 USER: {user['username']}")
@@ -448,49 +804,50 @@ def get_random_riddle(
     if category and category in RIDDLE_CATEGORIES:
         query["category"] = category
     
-    # Get unseen riddles
-    unseen_riddles = list(db.riddles.find(query))
+    # Count unseen riddles, stopping as soon as we know there are enough
+    unseen_count = await db.riddles.count_documents(query, limit=3)
+    
+    print(f"✅ UNSEEN riddles available: {unseen_count}{'+' if unseen_count >= 3 else ''}")
     
-    print(f"✅ UNSEEN riddles available: {len(unseen_riddles)}")
+    # If we have enough unseen riddles, use them (skipping ones served long ago)
+    riddle = await sample_riddle(query, seen_bloom) if unseen_count >= 3 else None
     
-    # If we have enough unseen riddles, use them
-    if len(unseen_riddles) >= 3:
-        riddle = random.choice(unseen_riddles)
+    if riddle:
         print(f"📖 Selected UNSEEN cached riddle: {riddle.get('answer', 'unknown')}")
     else:
         # Generate new riddle
         print(f"🤖 Generating NEW unique riddle...")
-        en_riddle = generate_fresh_ai_riddle(category or "general")
+        en_riddle = await generate_fresh_ai_riddle(category or "general")
         
         if not en_riddle:
             # If AI fails completely, use any available riddle
             print(f"⚠️ AI generation failed. Using available riddles...")
             
-            if unseen_riddles:
-                riddle = random.choice(unseen_riddles)
-            else:
+            if unseen_count:
+                riddle = await sample_riddle(query)
+            
+            if not riddle:
                 # Last resort: get any riddle
-                all_riddles = list(db.riddles.find({"language": language}))
-                if all_riddles:
-                    riddle = random.choice(all_riddles)
+                riddle = await sample_riddle({"language": language})
+                if riddle:
                     # Reset seen riddles for this user
-                    db.users.update_one(
+                    await db.users.update_one(
                         {"_id": user_id},
-                        {"$set": {"seen_riddles": []}}
+                        {"$set": {"seen_riddles": [], "seen_bloom": {}, "seen_riddles_count": 0}}
                     )
+                    invalidate_user_cache(user_id)
                     seen_riddles = []
                 else:
                     raise HTTPException(status_code=503, detail="No riddles available. Try again in a moment.")
         else:
             if language == "hi":
+                hindi_question = await run_in_threadpool(translate_to_hindi, en_riddle["question"])
+                hindi_answer = await run_in_threadpool(translate_to_hindi, en_riddle["answer"])
                 hindi_riddle = {
-                    "_id": str(ObjectId()),
-                    "question": translate_to_hindi(en_riddle["question"]),
-                    "answer": translate_to_hindi(en_riddle["answer"]),
-                    "riddle_hash": create_riddle_hash(
-                        translate_to_hindi(en_riddle["question"]),
-                        translate_to_hindi(en_riddle["answer"])
-                    ),
+                    "_id": ObjectId(),
+                    "question": hindi_question,
+                    "answer": hindi_answer,
+                    "riddle_hash": create_riddle_hash(hindi_question, hindi_answer),
                     "category": en_riddle["category"],
                     "difficulty": en_riddle["difficulty"],
                     "language": "hi",
@@ -498,21 +855,34 @@ def get_random_riddle(
                     "source": "groq_translated",
                     "created_at": datetime.utcnow()
                 }
-                db.riddles.insert_one(hindi_riddle)
+                await db.riddles.insert_one(hindi_riddle)
+                await record_riddle_insert("hi")
                 riddle = hindi_riddle
             else:
                 riddle = en_riddle
     
     riddle_id = str(riddle["_id"])
     
-    # Mark as seen with proper string ID
-    db.users.update_one(
-        {"_id": user_id},
-        {
-            "$addToSet": {"seen_riddles": riddle_id},
-            "$set": {f"current_riddle_attempts.{riddle_id}": 0}
-        }
-    )
+    # Mark as seen
+    masks = seen_bloom_masks(riddle["_id"])
+    mark_seen = {
+        "$push": {"seen_riddles": {"$each": [riddle["_id"]], "$slice": -SEEN_RIDDLES_LIMIT}},
+        "$set": {f"current_riddle_attempts.{riddle_id}": 0},
+        "$inc": {"seen_riddles_count": 1}
+    }
+    if seen_bloom is None:
+        mark_seen["$set"]["seen_bloom"] = {str(word): as_int64(mask) for word, mask in masks.items()}
+    else:
+        mark_seen["$bit"] = {f"seen_bloom.{word}": {"or": as_int64(mask)} for word, mask in masks.items()}
+    
+    await db.users.update_one({"_id": user_id}, mark_seen)
+    
+    # The cached user has no seen_riddles/seen_bloom, so only the attempts change.
+    # Patch it in place (re-setting would restart its TTL), and only if it is
+    # still the entry this request read; otherwise it was invalidated meanwhile.
+    if _user_cache.get(str(user_id)) is user:
+        user["current_riddle_attempts"] = {**user.get("current_riddle_attempts", {}), riddle_id: 0}
+        user["seen_riddles_count"] = user.get("seen_riddles_count", 0) + 1
     
     print(f"✅ DELIVERED: {riddle['question'][:50]}...")
     print(f"🆔 Answer: {riddle.get('answer', 'unknown')}")
@@ -528,20 +898,31 @@ def get_random_riddle(
         "attempts_left": 2
     }
 
+async def apply_stats_update(user_id: ObjectId, update_data: dict):
+    """Persist an answer's stats update after the response has been sent"""
+    
+    await db.users.update_one({"_id": user_id}, update_data)
+    invalidate_user_cache(user_id)
+
 @app.post("/check")
-def check_answer(data: AnswerRequest, user: dict = Depends(get_current_user)):
+async def check_answer(
+    data: AnswerRequest,
+    background_tasks: BackgroundTasks,
+    user: dict = Depends(get_current_user)
+):
     """Check answer - 2 attempts, then -5 points and BLOCK further attempts"""
     
-    riddle = db.riddles.find_one({"_id": data.riddle_id})
+    riddle = await db.riddles.find_one({"_id": parse_object_id(data.riddle_id, "Riddle not found")})
     
     if not riddle:
         raise HTTPException(status_code=404, detail="Riddle not found")
     
     user_id = user["_id"]
+    riddle_id = str(riddle["_id"])
     
     # Get current attempts
     attempts_data = user.get("current_riddle_attempts", {})
-    current_attempts = attempts_data.get(data.riddle_id, 0)
+    current_attempts = attempts_data.get(riddle_id, 0)
     
     # CRITICAL: If already failed 2 times, BLOCK
     if current_attempts >= 2:
@@ -568,7 +949,7 @@ def check_answer(data: AnswerRequest, user: dict = Depends(get_current_user)):
     
     update_data = {
         "$inc": {"solved": 1},
-        "$set": {f"current_riddle_attempts.{data.riddle_id}": new_attempts}
+        "$set": {f"current_riddle_attempts.{riddle_id}": new_attempts}
     }
     
     points_change = 0
@@ -625,11 +1006,32 @@ def check_answer(data: AnswerRequest, user: dict = Depends(get_current_user)):
     
     update_data.setdefault("$set", {})["last_active"] = datetime.utcnow()
     
-    db.users.update_one({"_id": user_id}, update_data)
-    updated_user = db.users.find_one({"_id": user_id})
+    # New stats follow from the state we already have plus this update
+    streak = user.get("streak", 0)
+    if "streak" in update_data["$set"]:
+        streak = update_data["$set"]["streak"]
+    elif "streak" in update_data["$inc"]:
+        streak += 1
+    
+    stats = {
+        "solved": user.get("solved", 0) + 1,
+        "correct": user.get("correct", 0) + (1 if correct else 0),
+        "streak": streak,
+        "points": user.get("points", 0) + points_change
+    }
+    
+    # The write happens after the response; keep the cached user in step meanwhile.
+    # Same rules as in /riddle: patch in place, and only the entry we read.
+    if _user_cache.get(str(user_id)) is user:
+        user.update({
+            **stats,
+            "last_active": update_data["$set"]["last_active"],
+            "current_riddle_attempts": {**attempts_data, riddle_id: new_attempts}
+        })
+    background_tasks.add_task(apply_stats_update, user_id, update_data)
     
     # Get user's rank
-    rank_info = get_user_rank(updated_user.get("points", 0))
+    rank_info = get_user_rank(stats["points"])
     
     return {
         "correct": correct,
@@ -639,88 +1041,92 @@ def check_answer(data: AnswerRequest, user: dict = Depends(get_current_user)):
         "attempts_left": 2 - new_attempts,
         "skip_to_next": skip_to_next,
         "max_attempts_reached": max_attempts_reached,
-        "stats": {
-            "solved": updated_user["solved"],
-            "correct": updated_user["correct"],
-            "streak": updated_user["streak"],
-            "points": updated_user.get("points", 0)
-        },
+        "stats": stats,
         "rank": rank_info
     }
 
 # ==================== ACHIEVEMENTS ====================
 
 @app.get("/achievements")
-def get_achievements(user: dict = Depends(get_current_user)):
+async def get_achievements(user: dict = Depends(get_current_user)):
     """Get user's achievements and next milestone"""
     
     points = user.get("points", 0)
-    current_rank = get_user_rank(points)
-    
-    # Find next milestone
-    next_rank = None
-    for achievement in ACHIEVEMENT_RANKS:
-        if points < achievement["points"]:
-            next_rank = achievement
-            break
-    
-    # Calculate all unlocked achievements
-    unlocked = []
-    for achievement in ACHIEVEMENT_RANKS:
-        if points >= achievement["points"]:
-            unlocked.append(achievement)
+    achievements = _ACHIEVEMENTS_BY_UNLOCKED[bisect_right(_RANK_POINTS, points)]
     
     return {
-        "current_rank": current_rank,
-        "next_rank": next_rank,
-        "points_to_next": next_rank["points"] - points if next_rank else 0,
-        "unlocked_achievements": unlocked,
-        "total_achievements": len(ACHIEVEMENT_RANKS),
-        "progress_percent": round((len(unlocked) / len(ACHIEVEMENT_RANKS)) * 100, 1)
+        **achievements,
+        "points_to_next": achievements["next_rank"]["points"] - points if achievements["next_rank"] else 0
     }
 
 # ==================== LEADERBOARD ====================
 
+# Leaderboard responses keyed by limit; a few seconds of staleness is fine
+_leaderboard_cache = TTLCache(maxsize=32, ttl=10)
+
 @app.get("/leaderboard")
-def get_leaderboard(limit: int = 10):
+async def get_leaderboard(limit: int = 10):
     """Get top players by points"""
     
-    top_players = list(db.users.find(
+    cached = _leaderboard_cache.get(limit)
+    if cached is not None:
+        return cached
+    
+    # Served entirely from the points index (covered query)
+    top_players = await db.users.find(
         {},
         {
+            "_id": 0,
             "username": 1,
             "points": 1,
             "correct": 1,
             "solved": 1,
             "streak": 1
         }
-    ).sort("points", -1).limit(limit))
+    ).sort("points", -1).limit(limit).to_list(None)
+    
+    # Achievement ranks for the whole page at once
+    count = len(top_players)
+    points = np.fromiter((p.get("points", 0) for p in top_players), dtype=np.int64, count=count)
+    correct = np.fromiter((p.get("correct", 0) for p in top_players), dtype=np.int64, count=count)
+    solved = np.fromiter((p.get("solved", 0) for p in top_players), dtype=np.int64, count=count)
+    
+    # Python's round() so values match /profile exactly (np.round differs on some ties)
+    accuracy = [
+        round((c / s * 100), 1) if s > 0 else 0
+        for c, s in zip(correct.tolist(), solved.tolist())
+    ]
+    rank_idx = np.maximum(np.searchsorted(_RANK_THRESHOLDS, points, side="right") - 1, 0)
     
     leaderboard = []
-    for rank, player in enumerate(top_players, 1):
-        accuracy = round((player.get("correct", 0) / player.get("solved", 1)) * 100, 1) if player.get("solved", 0) > 0 else 0
-        rank_info = get_user_rank(player.get("points", 0))
+    for rank, (player, player_points, player_correct, player_accuracy, idx) in enumerate(
+        zip(top_players, points.tolist(), correct.tolist(), accuracy, rank_idx.tolist()), 1
+    ):
+        rank_info = _RANK_INFO[idx]
         
         leaderboard.append({
             "rank": rank,
             "username": player["username"],
-            "points": player.get("points", 0),
-            "correct": player.get("correct", 0),
+            "points": player_points,
+            "correct": player_correct,
             "streak": player.get("streak", 0),
-            "accuracy": accuracy,
+            "accuracy": player_accuracy,
             "rank_title": rank_info["rank"],
             "rank_icon": rank_info["icon"]
         })
     
-    return {"leaderboard": leaderboard}
+    response = {"leaderboard": leaderboard}
+    _leaderboard_cache[limit] = response
+    
+    return response
 
 # ==================== DAILY CHALLENGE ====================
 
 @app.get("/daily-challenge")
-def get_daily_challenge(user: dict = Depends(get_current_user)):
+async def get_daily_challenge(user: dict = Depends(get_current_user)):
     """Get today's daily challenge"""
     
-    challenge = get_daily_challenge_riddle()
+    challenge = await get_daily_challenge_riddle()
     
     if not challenge:
         raise HTTPException(status_code=503, detail="Daily challenge not available")
@@ -731,24 +1137,24 @@ def get_daily_challenge(user: dict = Depends(get_current_user)):
     completed = today in user.get("daily_challenges_completed", [])
     
     return {
-        "challenge_id": challenge["_id"],
+        "challenge_id": str(challenge["_id"]),
         "date": challenge["date"],
         "riddle": {
-            "id": challenge["riddle"]["_id"],
+            "id": str(challenge["riddle"]["_id"]),
             "question": challenge["riddle"]["question"],
             "difficulty": challenge["riddle"]["difficulty"],
             "category": challenge["riddle"]["category"]
         },
-        "participants": len(challenge.get("participants", [])),
+        "participants": await get_participant_count(challenge["_id"]),
         "completed": completed
     }
 
 @app.post("/daily-challenge/answer")
-def answer_daily_challenge(data: DailyChallengeAnswer, user: dict = Depends(get_current_user)):
+async def answer_daily_challenge(data: DailyChallengeAnswer, user: dict = Depends(get_current_user)):
     """Submit answer for daily challenge"""
     
     today = datetime.utcnow().date().isoformat()
-    challenge = db.daily_challenges.find_one({"date": today})
+    challenge = _daily_cache.get(today) or await db.daily_challenges.find_one({"date": today})
     
     if not challenge:
         raise HTTPException(status_code=404, detail="No challenge today")
@@ -765,18 +1171,23 @@ def answer_daily_challenge(data: DailyChallengeAnswer, user: dict = Depends(get_
     if correct:
         bonus_points = 50
         
-        db.users.update_one(
-            {"_id": user["_id"]},
+        result = await db.users.update_one(
+            {"_id": user["_id"], "daily_challenges_completed": {"$ne": today}},
             {
-                "$inc": {"points": bonus_points, "correct": 1, "solved": 1},
-                "$addToSet": {"daily_challenges_completed": today}
+                "$inc": {"points": bonus_points, "correct": 1, "solved": 1, "daily_challenges_completed_count": 1},
+                "$push": {"daily_challenges_completed": today}
             }
         )
+        invalidate_user_cache(user["_id"])
+        
+        if not result.modified_count:
+            raise HTTPException(status_code=400, detail="Already completed today's challenge")
         
-        db.daily_challenges.update_one(
+        await db.daily_challenges.update_one(
             {"_id": challenge["_id"]},
             {"$addToSet": {"participants": user["username"]}}
         )
+        _participant_count_cache.pop(challenge["_id"], None)
         
         return {
             "correct": True,
@@ -784,10 +1195,11 @@ def answer_daily_challenge(data: DailyChallengeAnswer, user: dict = Depends(get_
             "bonus_points": bonus_points
         }
     else:
-        db.users.update_one(
+        await db.users.update_one(
             {"_id": user["_id"]},
             {"$inc": {"solved": 1}}
         )
+        invalidate_user_cache(user["_id"])
         
         return {
             "correct": False,
@@ -797,40 +1209,51 @@ def answer_daily_challenge(data: DailyChallengeAnswer, user: dict = Depends(get_
 
 # ==================== CATEGORIES ====================
 
+_categories_cache = TTLCache(maxsize=1, ttl=60)
+
 @app.get("/categories")
-def get_categories():
+async def get_categories():
     """Get available riddle categories"""
     
-    category_counts = {}
+    cached = _categories_cache.get("en")
+    if cached is not None:
+        return cached
     
-    for category in RIDDLE_CATEGORIES:
-        count = db.riddles.count_documents({"category": category, "language": "en"})
-        category_counts[category] = count
+    # One grouped count instead of a count_documents per category
+    counts = await db.riddles.aggregate([
+        {"$match": {"language": "en", "category": {"$in": RIDDLE_CATEGORIES}}},
+        {"$group": {"_id": "$category", "count": {"$sum": 1}}}
+    ]).to_list(None)
     
-    return {
+    category_counts = {c["_id"]: c["count"] for c in counts}
+    
+    response = {
         "categories": [
             {"name": cat, "count": category_counts.get(cat, 0)}
             for cat in RIDDLE_CATEGORIES
         ]
     }
+    _categories_cache["en"] = response
+    
+    return response
 
 # ==================== SHARE RIDDLES ====================
 
 @app.post("/share")
-def share_riddle(data: ShareRiddleRequest, user: dict = Depends(get_current_user)):
+async def share_riddle(data: ShareRiddleRequest, user: dict = Depends(get_current_user)):
     """Share a riddle"""
     
-    riddle = db.riddles.find_one({"_id": data.riddle_id})
+    riddle = await db.riddles.find_one({"_id": parse_object_id(data.riddle_id, "Riddle not found")})
     
     if not riddle:
         raise HTTPException(status_code=404, detail="Riddle not found")
     
-    db.riddles.update_one(
-        {"_id": data.riddle_id},
+    await db.riddles.update_one(
+        {"_id": riddle["_id"]},
         {"$inc": {"shares": 1}}
     )
     
-    share_url = f"https://riddleapp.com/riddle/{data.riddle_id}"
+    share_url = f"https://riddleapp.com/riddle/{riddle['_id']}"
     
     return {
         "message": "Riddle shared!",
@@ -842,10 +1265,10 @@ def share_riddle(data: ShareRiddleRequest, user: dict = Depends(get_current_user
     }
 
 @app.get("/riddle/shared/{riddle_id}")
-def get_shared_riddle(riddle_id: str):
+async def get_shared_riddle(riddle_id: str):
     """Get a shared riddle"""
     
-    riddle = db.riddles.find_one({"_id": riddle_id})
+    riddle = await db.riddles.find_one({"_id": parse_object_id(riddle_id, "Riddle not found")})
     
     if not riddle:
         raise HTTPException(status_code=404, detail="Riddle not found")
@@ -861,10 +1284,10 @@ def get_shared_riddle(riddle_id: str):
 # ==================== MULTIPLAYER ROOMS ====================
 
 @app.post("/multiplayer/create")
-def create_multiplayer_room(data: MultiplayerRoomCreate, user: dict = Depends(get_current_user)):
+async def create_multiplayer_room(data: MultiplayerRoomCreate, user: dict = Depends(get_current_user)):
     """Create a multiplayer room"""
     
-    room_id = str(ObjectId())
+    room_id = ObjectId()
     
     room = {
         "_id": room_id,
@@ -877,88 +1300,102 @@ def create_multiplayer_room(data: MultiplayerRoomCreate, user: dict = Depends(ge
             "score": 0,
             "answered": []
         }],
+        "player_count": 1,
         "max_players": data.max_players,
         "current_riddle": None,
         "status": "waiting",
         "created_at": datetime.utcnow()
     }
     
-    db.multiplayer_rooms.insert_one(room)
+    await db.multiplayer_rooms.insert_one(room)
     
     return {
-        "room_id": room_id,
+        "room_id": str(room_id),
         "room_name": data.room_name,
         "message": "Room created! Share room ID with friends."
     }
 
 @app.post("/multiplayer/join")
-def join_multiplayer_room(data: MultiplayerJoin, user: dict = Depends(get_current_user)):
+async def join_multiplayer_room(data: MultiplayerJoin, user: dict = Depends(get_current_user)):
     """Join a multiplayer room"""
     
-    room = db.multiplayer_rooms.find_one({"_id": data.room_id})
+    room = await db.multiplayer_rooms.find_one(
+        {"_id": parse_object_id(data.room_id, "Room not found")},
+        {"name": 1, "max_players": 1, "player_count": 1, "players.user_id": 1}
+    )
     
     if not room:
         raise HTTPException(status_code=404, detail="Room not found")
     
-    if len(room["players"]) >= room["max_players"]:
+    if room["player_count"] >= room["max_players"]:
         raise HTTPException(status_code=400, detail="Room is full")
     
     player_ids = [p["user_id"] for p in room["players"]]
     if user["_id"] in player_ids:
         raise HTTPException(status_code=400, detail="Already in room")
     
-    db.multiplayer_rooms.update_one(
-        {"_id": data.room_id},
-        {"$push": {
-            "players": {
-                "user_id": user["_id"],
-                "username": user["username"],
-                "score": 0,
-                "answered": []
-            }
-        }}
+    result = await db.multiplayer_rooms.update_one(
+        {"_id": room["_id"], "player_count": {"$lt": room["max_players"]}},
+        {
+            "$push": {
+                "players": {
+                    "user_id": user["_id"],
+                    "username": user["username"],
+                    "score": 0,
+                    "answered": []
+                }
+            },
+            "$inc": {"player_count": 1}
+        }
     )
     
+    # Someone else took the last seat in the meantime
+    if result.modified_count == 0:
+        raise HTTPException(status_code=400, detail="Room is full")
+    
     return {
         "message": f"Joined room: {room['name']}",
-        "room_id": data.room_id,
-        "players": len(room["players"]) + 1
+        "room_id": str(room["_id"]),
+        "players": room["player_count"] + 1
     }
 
 @app.get("/multiplayer/room/{room_id}")
-def get_multiplayer_room(room_id: str, user: dict = Depends(get_current_user)):
+async def get_multiplayer_room(room_id: str, user: dict = Depends(get_current_user)):
     """Get multiplayer room details"""
     
-    room = db.multiplayer_rooms.find_one({"_id": room_id})
+    room = await db.multiplayer_rooms.find_one(
+        {"_id": parse_object_id(room_id, "Room not found")},
+        {"name": 1, "host": 1, "players": 1, "status": 1, "current_riddle": 1}
+    )
     
     if not room:
         raise HTTPException(status_code=404, detail="Room not found")
     
     return {
-        "room_id": room["_id"],
+        "room_id": str(room["_id"]),
         "name": room["name"],
         "host": room["host"],
-        "players": room["players"],
+        "players": [{**p, "user_id": str(p["user_id"])} for p in room["players"]],
         "status": room["status"],
         "current_riddle": room.get("current_riddle")
     }
 
 @app.get("/multiplayer/rooms")
-def get_active_rooms():
+async def get_active_rooms():
     """Get list of active multiplayer rooms"""
     
-    rooms = list(db.multiplayer_rooms.find(
+    rooms = await db.multiplayer_rooms.find(
         {"status": {"$in": ["waiting", "active"]}},
-        {"name": 1, "host": 1, "players": 1, "max_players": 1}
-    ).limit(20))
+        {"_id": 1, "name": 1, "host": 1, "player_count": 1, "max_players": 1}
+    ).limit(20).to_list(20)
     
     return {
         "rooms": [
             {
-                "room_id": room["_id"],
+                "room_id": str(room["_id"]),
                 "name": room["name"],
                 "host": room["host"],
-                "players": len(room["players"]),
+                "players": room["player_count"],
                 "max_players": room["max_players"]
             }
             for room in rooms
@@ -967,17 +1404,37 @@ def get_active_rooms():
 
 # ==================== PROFILE & STATS ====================
 
+# Every user's points, negated so the array is ascending, for binary-search ranks
+RANK_SNAPSHOT_INTERVAL = 30
+_rank_snapshot = None
+
+async def refresh_rank_snapshot():
+    """Reload the points snapshot every RANK_SNAPSHOT_INTERVAL seconds"""
+    global _rank_snapshot
+    
+    while True:
+        try:
+            # Covered by the points index
+            users = await db.users.find({}, {"_id": 0, "points": 1}).sort("points", -1).to_list(None)
+            _rank_snapshot = -np.fromiter((u.get("points", 0) for u in users), dtype=np.int64, count=len(users))
+        except Exception as e:
+            print(f"⚠️ Rank snapshot refresh failed: {e}")
+        
+        await asyncio.sleep(RANK_SNAPSHOT_INTERVAL)
+
 @app.get("/profile")
-def get_profile(user: dict = Depends(get_current_user)):
+async def get_profile(user: dict = Depends(get_current_user)):
     solved = user.get("solved", 0)
     correct = user.get("correct", 0)
     accuracy = round((correct / solved * 100), 1) if solved > 0 else 0
-    seen_count = len(user.get("seen_riddles", []))
     points = user.get("points", 0)
     
-    users_with_higher_points = db.users.count_documents({
-        "points": {"$gt": points}
-    })
+    if _rank_snapshot is not None:
+        users_with_higher_points = int(np.searchsorted(_rank_snapshot, -points, side="left"))
+    else:
+        users_with_higher_points = await db.users.count_documents({
+            "points": {"$gt": points}
+        })
     rank = users_with_higher_points + 1
     
     # Get user's achievement rank
@@ -993,33 +1450,45 @@ def get_profile(user: dict = Depends(get_current_user)):
         "current_streak": user.get("streak", 0),
         "points": points,
         "rank": rank,
-        "unique_riddles_seen": seen_count,
-        "daily_challenges_completed": len(user.get("daily_challenges_completed", [])),
+        "unique_riddles_seen": user.get("seen_riddles_count", 0),
+        "daily_challenges_completed": user.get("daily_challenges_completed_count", 0),
         "achievement_rank": rank_info["rank"],
         "achievement_title": rank_info["title"],
         "achievement_icon": rank_info["icon"]
     }
 
 @app.post("/reset-history")
-def reset_history(user: dict = Depends(get_current_user)):
-    db.users.update_one(
+async def reset_history(user: dict = Depends(get_current_user)):
+    await db.users.update_one(
         {"_id": user["_id"]},
-        {"$set": {"seen_riddles": [], "current_riddle_attempts": {}}}
+        {"$set": {
+            "seen_riddles": [],
+            "seen_bloom": {},
+            "seen_riddles_count": 0,
+            "current_riddle_attempts": {}
+        }}
     )
+    invalidate_user_cache(user["_id"])
     return {"message": "History reset!"}
 
+# Responses for / and /test, which health checks and polls hit often
+_status_cache = TTLCache(maxsize=4, ttl=15)
+
 @app.get("/")
-def root():
-    riddle_count = db.riddles.count_documents({"language": "en"})
-    unique_answers = db.riddles.distinct("answer", {"language": "en"})
+async def root():
+    cached = _status_cache.get("root")
+    if cached is not None:
+        return cached
     
-    return {
+    stats = await get_riddle_stats()
+    
+    response = {
         "message": "🧩 AI Riddle App",
         "status": "running",
         "version": "5.1",
         "database": "MongoDB Atlas",
-        "total_riddles": riddle_count,
-        "unique_answers": len(unique_answers),
+        "total_riddles": stats.get("en_total", 0),
+        "unique_answers": stats.get("en_unique", 0),
         "rules": {
             "attempts": "2 per riddle",
             "correct": "+10 to +20 points (+5 bonus first try)",
@@ -1028,90 +1497,209 @@ def root():
             "ranks": "500, 1000, 1500, 2000+"
         }
     }
+    _status_cache["root"] = response
+    
+    return response
 
 @app.get("/test")
-def test():
-    en_count = db.riddles.count_documents({"language": "en"})
-    hi_count = db.riddles.count_documents({"language": "hi"})
-    total_users = db.users.count_documents({})
-    active_rooms = db.multiplayer_rooms.count_documents({"status": {"$in": ["waiting", "active"]}})
-    
-    # Get unique answers count
-    unique_answers = len(db.riddles.distinct("answer", {"language": "en"}))
+async def test():
+    cached = _status_cache.get("test")
+    if cached is not None:
+        return cached
+    
+    stats, total_users, active_rooms = await asyncio.gather(
+        get_riddle_stats(),
+        db.users.estimated_document_count(),
+        count_with_hint(
+            db.multiplayer_rooms,
+            {"status": {"$in": ["waiting", "active"]}},
+            ROOM_STATUS_INDEX
+        )
+    )
     
-    return {
+    response = {
         "status": "✅ All Features Active!",
         "database": "MongoDB Atlas",
-        "english_riddles": en_count,
-        "unique_english_answers": unique_answers,
-        "hindi_riddles": hi_count,
+        "english_riddles": stats.get("en_total", 0),
+        "unique_english_answers": stats.get("en_unique", 0),
+        "hindi_riddles": stats.get("hi_total", 0),
         "users": total_users,
         "active_multiplayer_rooms": active_rooms,
         "achievement_ranks": len(ACHIEVEMENT_RANKS),
-        "connection_pool": "50 max connections",
+        "connection_pool": "100 max connections",
         "ai_diversity": "Enhanced with duplicate detection"
     }
+    _status_cache["test"] = response
+    
+    return response
 
 # ==================== STARTUP ====================
 
-def startup_db():
-    """Initialize database on startup"""
+async def fill_user_defaults():
+    """Fields older user and room documents were created without"""
     
-    try:
-        # Fix all users
-        db.users.update_many(
-            {"seen_riddles": {"$exists": False}},
-            {"$set": {"seen_riddles": [], "points": 0, "daily_challenges_completed": [], "current_riddle_attempts": {}}}
-        )
+    await db.users.update_many({}, [{"$set": {
+        "seen_riddles": {"$ifNull": ["$seen_riddles", []]},
+        "points": {"$ifNull": ["$points", 0]},
+        "daily_challenges_completed": {"$ifNull": ["$daily_challenges_completed", []]},
+        "current_riddle_attempts": {"$ifNull": ["$current_riddle_attempts", {"$literal": {}}]}
+    }}])
+    
+    # Rooms created before player_count was stored
+    await db.multiplayer_rooms.update_many(
+        {"player_count": {"$exists": False}},
+        [{"$set": {"player_count": {"$size": {"$ifNull": ["$players", []]}}}}]
+    )
+
+async def trim_seen_riddles():
+    """Histories recorded before the $slice cap on /riddle"""
+    
+    # Keep the full history size as the seen count before the array is cut
+    await db.users.update_many(
+        {f"seen_riddles.{SEEN_RIDDLES_LIMIT}": {"$exists": True}},
+        [
+            {"$set": {"seen_riddles_count": {
+                "$ifNull": ["$seen_riddles_count", {"$size": "$seen_riddles"}]
+            }}},
+            {"$set": {"seen_riddles": {"$slice": ["$seen_riddles", -SEEN_RIDDLES_LIMIT]}}}
+        ]
+    )
+
+async def backfill_daily_challenge_count():
+    """/profile reads this counter instead of the full array"""
+    
+    await db.users.update_many(
+        {"daily_challenges_completed_count": {"$exists": False}},
+        [{"$set": {"daily_challenges_completed_count": {
+            "$size": {"$ifNull": ["$daily_challenges_completed", []]}
+        }}}]
+    )
+
+async def rehash_riddles():
+    """Add riddle_hash to old riddles, or replace the 32-char MD5 one with BLAKE3"""
+    
+    # No index covers this filter, which is why it only runs once
+    needs_hash = {"$or": [
+        {"riddle_hash": {"$exists": False}},
+        {"riddle_hash": {"$regex": "^[0-9a-f]{32}$"}}
+    ]}
+    
+    ops = []
+    async for riddle in db.riddles.find(needs_hash, {"question": 1, "answer": 1}):
+        riddle_hash = create_riddle_hash(riddle.get("question", ""), riddle.get("answer", ""))
+        ops.append(UpdateOne({"_id": riddle["_id"]}, {"$set": {"riddle_hash": riddle_hash}}))
         
-        db.users.update_many(
-            {"points": {"$exists": False}},
-            {"$set": {"points": 0}}
-        )
+        if len(ops) >= 1000:
+            await db.riddles.bulk_write(ops, ordered=False)
+            ops = []
+    
+    if ops:
+        await db.riddles.bulk_write(ops, ordered=False)
+
+async def backfill_seen_riddles_count():
+    """/profile reads this counter instead of the capped seen_riddles array"""
+    
+    await db.users.update_many(
+        {"seen_riddles_count": {"$exists": False}},
+        [{"$set": {"seen_riddles_count": {"$size": {"$ifNull": ["$seen_riddles", []]}}}}]
+    )
+
+# One-time data fixes as (schema version, step), applied in order. Add new
+# steps at the end with the next version number.
+MIGRATIONS = [
+    (2, fill_user_defaults),
+    (4, trim_seen_riddles),
+    (5, backfill_daily_challenge_count),
+    (6, rehash_riddles),
+    (7, backfill_seen_riddles_count),
+]
+
+# Single-field indexes made redundant by the compound ones in startup_db
+SUPERSEDED_INDEXES = {
+    "users": ("points_-1",),
+    "riddles": ("language_1", "riddle_hash_1", "answer_1"),
+}
+
+async def run_migrations():
+    """Apply pending data fixes, recording the version after each one"""
+    
+    schema = await db.meta.find_one({"_id": "schema"}) or {}
+    schema_version = schema.get("version", 0)
+    
+    for version, migrate in MIGRATIONS:
+        if version <= schema_version:
+            continue
         
-        db.users.update_many(
-            {"daily_challenges_completed": {"$exists": False}},
-            {"$set": {"daily_challenges_completed": []}}
-        )
+        # Stop at the first failure so later steps never run out of order;
+        # the failed step is retried on the next boot
+        try:
+            await migrate()
+        except Exception as e:
+            print(f"⚠️ Migration to schema version {version} failed: {e}")
+            return
         
-        db.users.update_many(
-            {"current_riddle_attempts": {"$exists": False}},
-            {"$set": {"current_riddle_attempts": {}}}
+        await db.meta.update_one(
+            {"_id": "schema"},
+            {"$set": {"version": version}},
+            upsert=True
         )
-        
-        # Add riddle_hash to existing riddles (migration)
-        riddles_without_hash = db.riddles.find({"riddle_hash": {"$exists": False}})
-        for riddle in riddles_without_hash:
-            riddle_hash = create_riddle_hash(riddle.get("question", ""), riddle.get("answer", ""))
-            db.riddles.update_one(
-                {"_id": riddle["_id"]},
-                {"$set": {"riddle_hash": riddle_hash}}
-            )
-        
+        print(f"✅ Database migrated to schema version {version}")
+
+@app.on_event("startup")
+async def startup_db():
+    """Initialize database on startup"""
+    
+    try:
+        await client.admin.command('ping')
+        print("✅ MongoDB Atlas connected successfully")
+    except Exception as e:
+        print(f"❌ MongoDB connection failed: {e}")
+        raise
+    
+    await run_migrations()
+    
+    try:
         # Create indexes
-        db.users.create_index([("email", 1)], unique=True)
-        db.users.create_index([("points", -1)])
-        db.users.create_index([("seen_riddles", 1)])
-        db.riddles.create_index([("answer", 1)])
-        db.riddles.create_index([("riddle_hash", 1)], unique=True)
-        db.riddles.create_index([("category", 1)])
-        db.riddles.create_index([("language", 1)])
-        db.daily_challenges.create_index([("date", 1)])
+        await db.users.create_index([("email", 1)], unique=True)
+        await db.users.create_index([
+            ("points", -1), ("username", 1), ("correct", 1), ("solved", 1), ("streak", 1)
+        ])
+        await db.users.create_index([("seen_riddles", 1)])
+        await db.riddles.create_index([("category", 1)])
+        await db.riddles.create_index([("language", 1), ("category", 1), ("_id", 1)])
+        await db.riddles.create_index(LANGUAGE_INDEX)
+        await db.riddles.create_index([("language", 1), ("riddle_hash", 1)], unique=True)
+        await db.daily_challenges.create_index([("date", 1)])
+        await db.multiplayer_rooms.create_index(ROOM_STATUS_INDEX)
+        await db.riddles.create_index(
+            [("answer", 1), ("language", 1)],
+            unique=True,
+            partialFilterExpression={"language": "en"}
+        )
         print("✅ Database indexes created")
+        
+        # Only reached once every replacement index above exists
+        for collection, index_names in SUPERSEDED_INDEXES.items():
+            for index_name in index_names:
+                try:
+                    await db[collection].drop_index(index_name)
+                except OperationFailure:
+                    pass
     except Exception as e:
         print(f"⚠️ Index warning: {e}")
     
-    en_count = db.riddles.count_documents({"language": "en"})
-    hi_count = db.riddles.count_documents({"language": "hi"})
-    total_users = db.users.count_documents({})
-    unique_answers = len(db.riddles.distinct("answer", {"language": "en"}))
+    stats, total_users = await asyncio.gather(
+        refresh_riddle_stats(),
+        db.users.estimated_document_count()
+    )
+    app.state.rank_snapshot_task = asyncio.create_task(refresh_rank_snapshot())
     
     print("=" * 60)
     print("🧩 AI RIDDLE APP - READY FOR DEPLOYMENT")
     print("=" * 60)
     print(f"☁️  Database: MongoDB Atlas")
-    print(f"📚 Riddles: {en_count} EN / {hi_count} HI")
-    print(f"🎯 Unique Answers: {unique_answers}")
+    print(f"📚 Riddles: {stats['en_total']} EN / {stats['hi_total']} HI")
+    print(f"🎯 Unique Answers: {stats['en_unique']}")
     print(f"👥 Users: {total_users}")
     print(f"🎲 AI Temperature: 1.8 (High Diversity)")
     print(f"🚫 Duplicate Detection: ENABLED")
@@ -1120,5 +1708,3 @@ def startup_db():
     print(f"❌ Wrong (2 attempts): -5 points + AUTO SKIP")
     print(f"🏆 Ranks: 500, 1000, 1500, 2000+")
     print("=" * 60)
-
-startup_db()
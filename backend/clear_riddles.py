@@ -7,8 +7,18 @@ db = client.riddle_app
 result = db.riddles.delete_many({})
 print(f"🗑️ Deleted {result.deleted_count} old riddles")
 
-# Reset all users' seen riddles
-result2 = db.users.update_many({}, {"$set": {"seen_riddles": []}})
+# Reset the counters shown on / and /test
+db.stats.update_one(
+    {"_id": "riddle_stats"},
+    {"$set": {"en_unique": 0, "en_total": 0, "hi_total": 0}},
+    upsert=True
+)
+
+# Reset seen riddles and attempts, only for users that have any
+result2 = db.users.update_many(
+    {"seen_riddles.0": {"$exists": True}},
+    {"$set": {"seen_riddles": [], "seen_bloom": {}, "seen_riddles_count": 0, "current_riddle_attempts": {}}}
+)
 print(f"🔄 Reset {result2.modified_count} users")
 
 # Check
@@ -10,24 +10,41 @@ db = client.riddle_app
 
 print("🔧 Fixing repeating riddles issue...\n")
 
-# Fix all users
-for user in db.users.find():
-    seen = user.get("seen_riddles", [])
-    
-    # Convert all to strings and remove duplicates
-    seen_clean = list(set([str(rid) for rid in seen if rid]))
-    
-    db.users.update_one(
-        {"_id": user["_id"]},
-        {
-            "$set": {
-                "seen_riddles": seen_clean,
-                "current_riddle_attempts": {}
-            }
+total_users = db.users.count_documents({})
+
+# Convert every seen id to an ObjectId (dropping anything that isn't one)
+seen_as_ids = {
+    "$map": {
+        "input": {"$ifNull": ["$seen_riddles", []]},
+        "in": {"$convert": {"input": "$$this", "to": "objectId", "onError": None, "onNull": None}}
+    }
+}
+
+# Drop duplicates and unconvertible ids, keeping first-seen order so the
+# $slice cap in /riddle still trims the oldest entries
+unique_seen = {
+    "$reduce": {
+        "input": seen_as_ids,
+        "initialValue": [],
+        "in": {
+            "$cond": [
+                {"$or": [{"$eq": ["$$this", None]}, {"$in": ["$$this", "$$value"]}]},
+                "$$value",
+                {"$concatArrays": ["$$value", ["$$this"]]}
+            ]
         }
-    )
-    
-    print(f"✅ Fixed user {user.get('username', 'Unknown')}: {len(seen_clean)} riddles seen")
+    }
+}
+
+# Fix all users in one server-side pass: convert, remove duplicates, reset attempts
+result = db.users.update_many({}, [{
+    "$set": {
+        "seen_riddles": unique_seen,
+        "current_riddle_attempts": {"$literal": {}}
+    }
+}])
+
+print(f"✅ Fixed {result.modified_count} of {total_users} users")
 
 print("\n✅ All fixes applied! Restart your backend.")
 client.close()
@@ -0,0 +1,73 @@
+from pymongo import MongoClient, UpdateOne
+from bson import ObjectId
+from dotenv import load_dotenv
+import os
+
+# One-shot migration: string _ids (str(ObjectId())) -> native BSON ObjectIds.
+# Stop the backend and take a backup before running. Safe to re-run.
+
+load_dotenv()
+
+MONGO_URL = os.getenv("MONGO_URL")
+DATABASE_NAME = os.getenv("DATABASE_NAME", "riddleapp")
+client = MongoClient(MONGO_URL)
+db = client[DATABASE_NAME]
+
+def to_object_id(value):
+    return ObjectId(value) if ObjectId.is_valid(value) else value
+
+def migrate_collection(collection, convert=None):
+    """Re-insert every document whose _id is still a hex string"""
+    migrated = 0
+
+    for doc in collection.find({"_id": {"$type": "string"}}):
+        if not ObjectId.is_valid(doc["_id"]):
+            continue
+
+        old_id = doc["_id"]
+        doc["_id"] = ObjectId(old_id)
+        if convert:
+            convert(doc)
+
+        # Delete first so unique indexes (email, riddle_hash, ...) don't reject the copy
+        collection.delete_one({"_id": old_id})
+        collection.insert_one(doc)
+        migrated += 1
+
+    print(f"✅ {collection.name}: {migrated} documents migrated")
+
+def convert_user(user):
+    user["seen_riddles"] = [to_object_id(rid) for rid in user.get("seen_riddles", []) if rid]
+
+def convert_challenge(challenge):
+    challenge["riddle_id"] = to_object_id(challenge.get("riddle_id"))
+    if challenge.get("riddle"):
+        challenge["riddle"]["_id"] = to_object_id(challenge["riddle"]["_id"])
+
+def convert_room(room):
+    room["host_id"] = to_object_id(room.get("host_id"))
+    for player in room.get("players", []):
+        player["user_id"] = to_object_id(player["user_id"])
+
+print("🔧 Migrating string ids to ObjectId...\n")
+
+migrate_collection(db.riddles)
+migrate_collection(db.users, convert_user)
+migrate_collection(db.daily_challenges, convert_challenge)
+migrate_collection(db.multiplayer_rooms, convert_room)
+
+# Users that already had ObjectId _ids may still hold string references
+ops = []
+for user in db.users.find({"seen_riddles": {"$type": "string"}}, {"seen_riddles": 1}, batch_size=500):
+    convert_user(user)
+    ops.append(UpdateOne({"_id": user["_id"]}, {"$set": {"seen_riddles": user["seen_riddles"]}}))
+    
+    if len(ops) >= 500:
+        db.users.bulk_write(ops, ordered=False)
+        ops = []
+
+if ops:
+    db.users.bulk_write(ops, ordered=False)
+
+print("\n✅ Migration complete! Restart your backend.")
+client.close()
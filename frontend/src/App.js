@@ -68,7 +68,14 @@ function App() {
     setLoading(false);
   };
 
-  const logout = () => {
+  const logout = async () => {
+    try {
+      // Revoke the token server-side too, not just on this device
+      await axios.post(`${API_URL}/logout`, {}, axiosConfig);
+    } catch (error) {
+      console.error('Logout error:', error);
+    }
+
     setToken(null);
     setUser(null);
     localStorage.removeItem('token');